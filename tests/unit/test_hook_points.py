@@ -0,0 +1,211 @@
+import copy
+import pickle
+
+import pytest
+import torch
+import torch.nn as nn
+
+from transformer_lens.hook_points import (
+    HookedRootModule,
+    HookPoint,
+    LazyActivation,
+)
+
+
+class Counter:
+    def __init__(self):
+        self.count = 0
+
+    def inc(self, *args, **kwargs):
+        self.count += 1
+
+
+class TinyConfig:
+    device = "cpu"
+
+
+class TinyModel(HookedRootModule):
+    """A minimal two-layer HookedRootModule, so hook mechanics can be tested on CPU
+    without downloading a pretrained transformer."""
+
+    def __init__(self):
+        super().__init__()
+        self.cfg = TinyConfig()
+        self.linear1 = nn.Linear(4, 4)
+        self.hook_mid = HookPoint()
+        self.linear2 = nn.Linear(4, 4)
+        self.hook_out = HookPoint()
+        self.setup()
+
+    def forward(self, x):
+        return self.hook_out(self.linear2(self.hook_mid(self.linear1(x))))
+
+
+x = torch.ones(2, 4)
+
+
+def test_names_filter_str_and_list():
+    model = TinyModel()
+    _, cache = model.run_with_cache(x, names_filter="hook_mid")
+    assert set(cache.keys()) == {"hook_mid"}
+    _, cache = model.run_with_cache(x, names_filter=["hook_mid", "hook_out"])
+    assert set(cache.keys()) == {"hook_mid", "hook_out"}
+    _, cache = model.run_with_cache(x, names_filter=lambda name: name == "hook_out")
+    assert set(cache.keys()) == {"hook_out"}
+
+
+def test_multiple_hooks_chain_in_order():
+    model = TinyModel()
+    plain = model(x)
+
+    def add_one(z, hook):
+        return z + 1.0
+
+    def double(z, hook):
+        return z * 2.0
+
+    hooked = model.run_with_hooks(
+        x, fwd_hooks=[("hook_out", add_one), ("hook_out", double)]
+    )
+    assert torch.allclose(hooked, (plain + 1.0) * 2.0)
+    # Both user hooks are gone, and so is the shared PyTorch adapter hook
+    assert len(model.hook_dict["hook_out"].fwd_hooks) == 0
+    assert len(model.hook_dict["hook_out"]._forward_hooks) == 0
+
+
+def test_pytorch_registered_hooks_still_fire():
+    # Hooks registered through the inherited PyTorch API (bypassing add_hook) must not
+    # be skipped by HookPoint.__call__'s no-hooks fast path
+    model = TinyModel()
+    fwd, pre = Counter(), Counter()
+    fwd_handle = model.hook_mid.register_forward_hook(fwd.inc)
+    pre_handle = model.hook_mid.register_forward_pre_hook(pre.inc)
+    model(x)
+    assert fwd.count == 1
+    assert pre.count == 1
+    fwd_handle.remove()
+    pre_handle.remove()
+    model(x)
+    assert fwd.count == 1
+    assert pre.count == 1
+
+
+def test_run_with_hooks_leaves_preexisting_hooks():
+    model = TinyModel()
+    pre_existing = Counter()
+    model.add_hook("hook_mid", pre_existing.inc)
+    temp = Counter()
+    model.run_with_hooks(x, fwd_hooks=[("hook_out", temp.inc)])
+    assert temp.count == 1
+    assert pre_existing.count == 1
+    # The temporary hook is removed, the pre-existing (non-permanent) one survives
+    assert len(model.hook_dict["hook_out"].fwd_hooks) == 0
+    assert len(model.hook_dict["hook_mid"].fwd_hooks) == 1
+    model(x)
+    assert pre_existing.count == 2
+    model.remove_all_hook_fns(including_permanent=True)
+
+
+def test_run_with_hooks_bad_name_installs_nothing():
+    model = TinyModel()
+    c = Counter()
+    with pytest.raises(KeyError):
+        model.run_with_hooks(
+            x, fwd_hooks=[("hook_out", c.inc), ("not_a_hook", c.inc)]
+        )
+    # The bad name is caught before anything is installed or run
+    assert all(len(hp.fwd_hooks) == 0 for hp in model.hook_points())
+    assert c.count == 0
+
+
+def test_bwd_hooks_with_filter():
+    model = TinyModel()
+    c = Counter()
+    out = model.run_with_hooks(
+        x,
+        bwd_hooks=[(lambda name: name == "hook_mid", c.inc)],
+        reset_hooks_end=False,
+    )
+    out.sum().backward()
+    assert c.count == 1
+    model.remove_all_hook_fns(including_permanent=True)
+
+
+def test_cache_dtype():
+    model = TinyModel()
+    _, cache = model.run_with_cache(x, cache_dtype=torch.float16)
+    assert all(t.dtype == torch.float16 for t in cache.values())
+
+
+def test_recompute_placeholder():
+    model = TinyModel()
+    _, cache = model.run_with_cache(x, recompute={"hook_mid"})
+    assert isinstance(cache["hook_mid"], LazyActivation)
+    assert isinstance(cache["hook_out"], torch.Tensor)
+    # materialize() with no arguments reruns the recorded inputs
+    expected = model.run_with_cache(x)[1]["hook_mid"]
+    assert torch.allclose(cache["hook_mid"].materialize(), expected)
+
+
+def test_recompute_unknown_name_raises():
+    model = TinyModel()
+    with pytest.raises(ValueError):
+        model.add_caching_hooks(recompute={"not_a_hook"})
+
+
+def test_optimize_for_inference_and_restore():
+    model = TinyModel()
+    perma = Counter()
+    model.add_perma_hook("hook_mid", perma.inc)
+    out_before = model(x)
+    model.optimize_for_inference()
+    # Hook-free points become Identity, hooked ones are kept
+    assert isinstance(model.hook_out, nn.Identity)
+    assert isinstance(model.hook_mid, HookPoint)
+    assert "hook_out" not in model.hook_dict
+    assert torch.allclose(model(x), out_before)
+    model.restore_hook_points()
+    assert isinstance(model.hook_out, HookPoint)
+    assert "hook_out" in model.hook_dict
+    model.remove_all_hook_fns(including_permanent=True)
+
+
+def test_stacked_cache():
+    model = TinyModel()
+    _, plain = model.run_with_cache(x)
+    _, cache = model.run_with_cache(x, stacked=True)
+    mid, out = cache["hook_mid"], cache["hook_out"]
+    assert torch.allclose(mid, plain["hook_mid"])
+    assert torch.allclose(out, plain["hook_out"])
+    # Both entries are adjacent views of one contiguous backing tensor
+    assert out.data_ptr() - mid.data_ptr() == mid.numel() * mid.element_size()
+
+
+def test_optimize_for_inference_keeps_pytorch_hooks():
+    # A hook registered through the inherited PyTorch API (bypassing add_hook) must
+    # also protect its HookPoint from being replaced by an Identity
+    model = TinyModel()
+    c = Counter()
+    handle = model.hook_out.register_forward_hook(c.inc)
+    model.optimize_for_inference()
+    assert isinstance(model.hook_out, HookPoint)
+    assert isinstance(model.hook_mid, nn.Identity)
+    model(x)
+    assert c.count == 1
+    handle.remove()
+    model.restore_hook_points()
+
+
+def test_model_picklable_after_caching_run():
+    # Caching runs must not leave unpicklable state (e.g. CUDA streams) on the
+    # model - torch.save and copy.deepcopy should keep working afterwards
+    model = TinyModel()
+    model.run_with_cache(x)
+    pickle.dumps(model)
+    copy.deepcopy(model)
+
+
+def test_stacked_cache_shape_mismatch_raises():
+    model = TinyModel()
+    with pytest.raises(ValueError):
+        model._stack_cache({"a": torch.ones(2, 4), "b": torch.ones(2, 3)})
@@ -1,90 +1,319 @@
 # Import stuff
 import logging
-from typing import Callable, Union, Optional, Sequence, Dict, List, Tuple
+import weakref
+from typing import Callable, Union, Optional, Sequence, Set, Dict, List, Tuple
 import torch
 import torch.nn as nn
-import torch.utils.hooks as hooks
+from torch.utils.hooks import RemovableHandle
 
-from functools import *
+# The global hook registries are module-level dicts that are only ever mutated in place,
+# so we can safely bind them once here rather than looking them up on every call.
+from torch.nn.modules.module import (
+    _global_backward_hooks,
+    _global_forward_hooks,
+    _global_forward_pre_hooks,
+)
 
-from dataclasses import dataclass
-
-@dataclass
 class LensHandle:
-    hook: hooks.RemovableHandle
-    is_permanent: bool = False
-    
+    # The user's hook function, with signature fn(activation, hook=hook_point). The
+    # PyTorch-level registration is a single shared adapter per HookPoint (see
+    # _fwd_hook_adapter/_bwd_hook_adapter), so LensHandle just records the user hook.
+    # A plain slotted class rather than a dataclass - models accumulate thousands of
+    # handles, and slots skip the per-instance __dict__. (dataclass(slots=True) needs
+    # Python 3.10, and we support 3.7.)
+    __slots__ = ("user_hook", "is_permanent")
+
+    def __init__(self, user_hook: Callable, is_permanent: bool = False):
+        self.user_hook = user_hook
+        self.is_permanent = is_permanent
+
+    def __repr__(self):
+        return f"LensHandle(user_hook={self.user_hook!r}, is_permanent={self.is_permanent})"
+
+
+class LazyActivation:
+    """Placeholder stored in an activation cache for hook points selected for
+    recomputation rather than storage (the recompute argument to add_caching_hooks).
+
+    Storing nothing and recomputing on demand trades compute for memory - useful for
+    activations that are cheap to rederive but large to keep around. Since a HookPoint
+    is the identity function there is no local subgraph to replay in isolation, so
+    materialize() reruns a forward pass, caching just this one hook point.
+    """
+
+    __slots__ = ("_model_ref", "name", "_model_args", "_model_kwargs", "__weakref__")
+
+    def __init__(self, model, name: str):
+        # A weak reference, so a cache full of placeholders doesn't keep the model
+        # alive on its own.
+        self._model_ref = weakref.ref(model)
+        self.name = name
+        self._model_args = None
+        self._model_kwargs = None
+
+    def __repr__(self):
+        return f"LazyActivation(name={self.name!r})"
+
+    def _bind_inputs(self, model_args, model_kwargs):
+        # Called by run_with_cache to record the run's inputs, so materialize() can
+        # rerun them without the caller having to repeat (and possibly mismatch) them.
+        self._model_args = model_args
+        self._model_kwargs = model_kwargs
+
+    def materialize(self, *model_args, **model_kwargs):
+        """Reruns the model to rederive this activation.
+
+        Called with no arguments it reuses the inputs recorded by run_with_cache.
+        Inputs passed explicitly are used instead - they must be the original run's
+        inputs for the result to correspond to the rest of the cache.
+
+        WARNING: this calls run_with_cache internally with its default
+        reset_hooks_end=True, which removes every non-permanent hook currently on the
+        model - only call it once the caching run (and any backward pass) is finished.
+        """
+        model = self._model_ref()
+        if model is None:
+            raise RuntimeError(
+                f"Cannot materialize {self.name} - the model it was cached from has been garbage collected"
+            )
+        if not model_args and not model_kwargs:
+            if self._model_args is None:
+                raise ValueError(
+                    f"No inputs recorded for {self.name} - pass the model inputs to materialize()"
+                )
+            model_args, model_kwargs = self._model_args, self._model_kwargs
+        _, cache = model.run_with_cache(
+            *model_args, names_filter=self.name, **model_kwargs
+        )
+        return cache[self.name]
+
+
+def _fwd_hook_adapter(module, module_input, module_output):
+    # The single PyTorch forward hook registered per HookPoint. Dispatches to the user
+    # hooks stored in module.fwd_hooks, chaining their outputs. Registering one adapter
+    # rather than one closure per user hook avoids a function-object plus
+    # RemovableHandle allocation on every add_hook call, and keeps PyTorch's hook dict
+    # at a single entry however many user hooks are attached.
+    for handle in module.fwd_hooks:
+        out = handle.user_hook(module_output, hook=module)
+        if out is not None:
+            module_output = out
+    return module_output
+
+
+def _bwd_hook_adapter(module, grad_input, grad_output):
+    # As _fwd_hook_adapter, for full backward hooks. grad_output is a tuple of (grad,) -
+    # I don't know why. The last user hook to return a non-None value wins, matching the
+    # behaviour of separately registered PyTorch hooks when at most one hook intervenes.
+    result = None
+    for handle in module.bwd_hooks:
+        out = handle.user_hook(grad_output[0], hook=module)
+        if out is not None:
+            result = out
+    return result
+
 
 # %%
 # Define type aliases
 NamesFilter = Optional[Union[Callable[[str], bool], Sequence[str]]]
 
+
+# Maps a hook direction specifier to (affects_fwd, affects_bwd), replacing repeated
+# string comparisons on the frequently-called remove_hooks path.
+_DIR_MAP = {"fwd": (True, False), "bwd": (False, True), "both": (True, True)}
+
+
+# Dedicated CUDA streams for caching copies, one per device - issuing the
+# device-to-host copies on a side stream lets them overlap with the next layer's
+# compute on the default stream. Kept at module level rather than on the model
+# because torch.cuda.Stream is neither picklable nor deep-copyable, so an instance
+# attribute would break torch.save(model) after the first caching run.
+_cache_streams: Dict[int, "torch.cuda.Stream"] = {}
+
+
+def _get_cache_stream():
+    device = torch.cuda.current_device()
+    stream = _cache_streams.get(device)
+    if stream is None:
+        stream = torch.cuda.Stream(device=device)
+        _cache_streams[device] = stream
+    return stream
+
+
+def _make_name_matcher(name) -> Callable[[str], bool]:
+    # Normalizes a hook-name specifier (a single name, a collection of names, or a
+    # Boolean function on names) into one predicate built once at the call site, so the
+    # per-hook-point loops don't re-branch on the specifier's type. For strings and
+    # collections the predicate is a C-level bound method (str.__eq__ /
+    # frozenset.__contains__), which is faster than an equivalent lambda.
+    if isinstance(name, str):
+        return name.__eq__
+    if isinstance(name, (list, tuple, set, frozenset)):
+        return frozenset(name).__contains__
+    return name
+
 # %%
 # A helper class to get access to intermediate activations (inspired by Garcon)
 # It's a dummy module that is the identity function by default
 # I can wrap any intermediate activation in a HookPoint and get a convenient
 # way to add PyTorch hooks
 class HookPoint(nn.Module):
+    # Declaring no slots of our own keeps HookPoint from adding a second __dict__ layer
+    # on top of nn.Module's (Module itself is not slotted, so instances still carry its
+    # __dict__ - the real per-instance saving is in LensHandle above).
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self.fwd_hooks: List[LensHandle] = []
         self.bwd_hooks: List[LensHandle] = []
-        self.ctx = {}
+        # Cached flags for whether any hooks are attached, so the hot __call__ path can
+        # branch on a single attribute load rather than probing PyTorch's hook dicts.
+        # Only updated in add_hook/remove_hooks.
+        self._has_fwd_hooks = False
+        self._has_bwd_hooks = False
+        # Handles for the single shared adapter hook registered with PyTorch in each
+        # direction - created on first add_hook, removed when the last hook goes.
+        self._fwd_adapter_handle: Optional[RemovableHandle] = None
+        self._bwd_adapter_handle: Optional[RemovableHandle] = None
 
         # A variable giving the hook's name (from the perspective of the root
         # module) - this is set by the root module at setup.
         self.name = None
 
+    @property
+    def ctx(self):
+        # The context dict is created lazily on first access - the vast majority of
+        # hook points never have context written to them, so eagerly allocating a dict
+        # per HookPoint at model construction (~1000 dicts for a 48-layer model) is
+        # wasted work.
+        ctx = self.__dict__.get("_ctx")
+        if ctx is None:
+            ctx = {}
+            self.__dict__["_ctx"] = ctx
+        return ctx
+
+    @ctx.setter
+    def ctx(self, value):
+        self.__dict__["_ctx"] = value
+
     def add_perma_hook(self, hook, dir="fwd") -> None:
         self.add_hook(hook, dir=dir, is_permanent=True)
 
-    def add_hook(self, hook, dir="fwd", is_permanent=False) -> None:
+    def add_hook(self, hook, dir="fwd", is_permanent=False) -> LensHandle:
         # Hook format is fn(activation, hook_name)
         # Change it into PyTorch hook format (this includes input and output,
         # which are the same for a HookPoint)
+        # Returns the LensHandle, so callers can later remove exactly this hook via
+        # remove_handle.
+        lens_handle = LensHandle(hook, is_permanent)
         if dir == "fwd":
+            if self._fwd_adapter_handle is None:
+                self._fwd_adapter_handle = self.register_forward_hook(_fwd_hook_adapter)
+            self.fwd_hooks.append(lens_handle)
+            self._has_fwd_hooks = True
+        elif dir == "bwd":
+            if self._bwd_adapter_handle is None:
+                self._bwd_adapter_handle = self.register_full_backward_hook(
+                    _bwd_hook_adapter
+                )
+            self.bwd_hooks.append(lens_handle)
+            self._has_bwd_hooks = True
+        else:
+            raise ValueError(f"Invalid direction {dir}")
+        return lens_handle
 
-            def full_hook(module, module_input, module_output):
-                return hook(module_output, hook=self)
-
-            handle = self.register_forward_hook(full_hook)
-            handle = LensHandle(handle, is_permanent)
-            self.fwd_hooks.append(handle)
+    def remove_handle(self, handle: LensHandle, dir="fwd") -> None:
+        # Removes one specific handle previously returned by add_hook, leaving all
+        # other hooks (permanent or not) in place. A no-op if the handle has already
+        # been removed, e.g. by a reset_hooks sweep.
+        if dir == "fwd":
+            try:
+                self.fwd_hooks.remove(handle)
+            except ValueError:
+                return
+            self._has_fwd_hooks = bool(self.fwd_hooks)
+            if not self.fwd_hooks and self._fwd_adapter_handle is not None:
+                self._fwd_adapter_handle.remove()
+                self._fwd_adapter_handle = None
         elif dir == "bwd":
-            # For a backwards hook, module_output is a tuple of (grad,) - I don't know why.
-            def full_hook(module, module_input, module_output):
-                return hook(module_output[0], hook=self)
-            handle = self.register_full_backward_hook(full_hook)
-            handle = LensHandle(handle, is_permanent)
-            self.bwd_hooks.append(handle)
+            try:
+                self.bwd_hooks.remove(handle)
+            except ValueError:
+                return
+            self._has_bwd_hooks = bool(self.bwd_hooks)
+            if not self.bwd_hooks and self._bwd_adapter_handle is not None:
+                self._bwd_adapter_handle.remove()
+                self._bwd_adapter_handle = None
         else:
             raise ValueError(f"Invalid direction {dir}")
 
     def remove_hooks(self, dir="fwd", including_permanent=False) -> None:
+        try:
+            do_fwd, do_bwd = _DIR_MAP[dir]
+        except KeyError:
+            raise ValueError(f"Invalid direction {dir}")
 
         def _remove_hooks(handles: List[LensHandle]) -> List[LensHandle]:
-            output_handles = []
-            for handle in handles:
-                if not handle.is_permanent or including_permanent:
-                    handle.hook.remove()
-                else:
-                    output_handles.append(handle)
-            return output_handles
-
-        if dir == "fwd" or dir == "both":
+            # User hooks live on this HookPoint rather than in PyTorch's registry, so
+            # removal is just list filtering - the shared adapter handle is only
+            # unregistered once the list empties.
+            return [
+                handle
+                for handle in handles
+                if handle.is_permanent and not including_permanent
+            ]
+
+        if do_fwd:
             self.fwd_hooks = _remove_hooks(self.fwd_hooks)
-        if dir == "bwd" or dir == "both":
+            self._has_fwd_hooks = bool(self.fwd_hooks)
+            if not self.fwd_hooks and self._fwd_adapter_handle is not None:
+                self._fwd_adapter_handle.remove()
+                self._fwd_adapter_handle = None
+        if do_bwd:
             self.bwd_hooks = _remove_hooks(self.bwd_hooks)
-        if dir not in ["fwd", "bwd", "both"]:
-            raise ValueError(f"Invalid direction {dir}")
+            self._has_bwd_hooks = bool(self.bwd_hooks)
+            if not self.bwd_hooks and self._bwd_adapter_handle is not None:
+                self._bwd_adapter_handle.remove()
+                self._bwd_adapter_handle = None
 
     def clear_context(self):
-        del self.ctx
-        self.ctx = {}
+        self.__dict__.pop("_ctx", None)
 
     def forward(self, x):
         return x
 
+    def __call__(self, x):
+        # Fast path - a HookPoint is the identity unless a hook is attached, so when no
+        # hooks are registered (locally or globally) we can return the input directly and
+        # skip nn.Module.__call__'s dispatch machinery entirely. This saves a couple of
+        # microseconds per hook point per forward pass, which adds up - models have dozens
+        # of hook points per layer. We check the per-instance hook dicts themselves
+        # (attribute loads plus truthiness, no hashing), so hooks registered directly
+        # through PyTorch's register_forward_hook/register_forward_pre_hook/
+        # register_full_backward_hook still fire.
+        if not (
+            self._forward_hooks
+            or self._forward_pre_hooks
+            or self._backward_hooks
+            or _global_forward_hooks
+            or _global_backward_hooks
+            or _global_forward_pre_hooks
+        ):
+            return x
+        return super().__call__(x)
+
+    def as_identity_if_empty(self):
+        # Returns an nn.Identity to stand in for this HookPoint if no hooks are
+        # attached, else the HookPoint itself - used by
+        # HookedRootModule.optimize_for_inference to strip hook dispatch entirely.
+        # Like the __call__ fast path, this checks PyTorch's own hook dicts rather
+        # than just the add_hook bookkeeping, so a hook registered directly through
+        # register_forward_hook and friends is never silently discarded.
+        if self._forward_hooks or self._forward_pre_hooks or self._backward_hooks:
+            return self
+        return nn.Identity()
+
     def layer(self):
         # Returns the layer index if the name has the form 'blocks.{layer}.{...}'
         # Helper function that's mainly useful on HookedTransformer
@@ -107,6 +336,28 @@ class HookedRootModule(nn.Module):
     def __init__(self, *args):
         super().__init__()
         self.is_caching = False
+        # Set by caching hooks when they issue async device-to-host copies, so
+        # run_with_cache knows it must synchronize before handing the cache back.
+        self._cache_needs_sync = False
+        # Coalesced pinned staging buffer for GPU-to-CPU activation caching - one large
+        # pinned allocation with per-hook-name slices, so we pin once and the async
+        # copies coalesce instead of each staging through its own small buffer. Built
+        # lazily from the shapes observed on the first caching pass (see
+        # add_caching_hooks and _build_pinned_blob).
+        self._pinned_blob: Optional[torch.Tensor] = None
+        self._pinned_layout: Dict[str, Tuple[int, Tuple[int, ...], torch.dtype]] = {}
+        self._pinned_specs: Dict[str, Tuple[Tuple[int, ...], torch.dtype]] = {}
+        self._pinned_stale = False
+        # (cache, key) pairs whose values are views into reused staging memory;
+        # run_with_cache clones these out after synchronizing so the returned cache
+        # isn't clobbered by the next run.
+        self._staged_cache_entries: List[Tuple[dict, str]] = []
+        # HookPoints swapped out by optimize_for_inference, keyed by name, so
+        # restore_hook_points can reinstall them.
+        self._replaced_hook_points: Dict[str, HookPoint] = {}
+        # Set by self.compile_forward() - when not None, calls to the model go through
+        # the torch.compile'd forward instead of the eager one.
+        self._compiled_forward = None
 
     def setup(self):
         # Setup function - this needs to be run in __init__ AFTER defining all
@@ -120,9 +371,78 @@ class HookedRootModule(nn.Module):
             self.mod_dict[name] = module
             if "HookPoint" in str(type(module)):
                 self.hook_dict[name] = module
+        # The set of hook points is fixed once setup has run, so cache tuple snapshots
+        # for iteration - tuple iteration is noticeably faster than walking the dict's
+        # hash table, and these are iterated on every add_hook/reset_hooks call.
+        self._hook_items: Tuple[Tuple[str, HookPoint], ...] = tuple(
+            self.hook_dict.items()
+        )
+        self._hook_values: Tuple[HookPoint, ...] = tuple(self.hook_dict.values())
 
     def hook_points(self):
-        return self.hook_dict.values()
+        return self._hook_values
+
+    def optimize_for_inference(self):
+        """Replaces every HookPoint with no hooks attached by an nn.Identity module.
+
+        Intended for production inference where no hooks will be used - it removes hook
+        dispatch from the forward pass entirely, and under torch.compile or tracing the
+        Identity modules fold away to nothing. Hook points with hooks attached
+        (including permanent ones) are left in place, but note that hooks can no longer
+        be added to the replaced ones: call restore_hook_points() to undo the swap.
+        """
+        for name, hp in self._hook_items:
+            replacement = hp.as_identity_if_empty()
+            if replacement is hp:
+                continue
+            parent_name, _, attr_name = name.rpartition(".")
+            parent = self.mod_dict[parent_name] if parent_name else self
+            setattr(parent, attr_name, replacement)
+            self._replaced_hook_points[name] = hp
+        # Rebuild mod_dict/hook_dict so the replaced hook points drop out of them.
+        self.setup()
+        return self
+
+    def restore_hook_points(self):
+        """Reinstalls the HookPoints that optimize_for_inference replaced."""
+        for name, hp in self._replaced_hook_points.items():
+            parent_name, _, attr_name = name.rpartition(".")
+            parent = self.mod_dict[parent_name] if parent_name else self
+            setattr(parent, attr_name, hp)
+        self._replaced_hook_points = {}
+        self.setup()
+        return self
+
+    def compile_forward(self, mode: str = "default", **compile_kwargs):
+        """Compiles the model's forward pass with torch.compile.
+
+        Requires PyTorch 2.0+, which is above the project's current pin - on earlier
+        versions this raises a clear RuntimeError. Named compile_forward rather than
+        compile so it doesn't shadow nn.Module.compile (torch 2.1+), which compiles
+        the module in place with different semantics.
+
+        All subsequent calls (including via run_with_hooks and run_with_cache) go through
+        the compiled forward. HookPoints are identity modules so they trace away cleanly
+        when no hooks are attached.
+
+        WARNING: Hooks are global state and are baked into torch.compile's guards, so
+        attach any hooks (including permanent ones) *before* the first call to the
+        compiled model - adding or removing hooks afterwards triggers a recompilation.
+        In particular, run_with_cache with a varying names_filter will recompile on each
+        change of filter; if you hit this, clear hooks between runs or stick to eager
+        mode for exploratory work.
+        """
+        if not hasattr(torch, "compile"):
+            raise RuntimeError(
+                "torch.compile is not available - HookedRootModule.compile_forward requires PyTorch 2.0 or later"
+            )
+        self._compiled_forward = torch.compile(self.forward, mode=mode, **compile_kwargs)
+        return self
+
+    def __call__(self, *args, **kwargs):
+        if self._compiled_forward is not None:
+            return self._compiled_forward(*args, **kwargs)
+        return super().__call__(*args, **kwargs)
 
     def remove_all_hook_fns(self, direction="both", including_permanent=False):
         for hp in self.hook_points():
@@ -143,12 +463,13 @@ class HookedRootModule(nn.Module):
         hook_point.add_hook(hook, dir=dir, is_permanent=is_permanent)
 
     def add_hook(self, name, hook, dir="fwd", is_permanent=False) -> None:
-        if type(name) == str:
+        if isinstance(name, str):
             self.check_and_add_hook(self.mod_dict[name], name, hook, dir=dir, is_permanent=is_permanent)
         else:
-            # Otherwise, name is a Boolean function on names
-            for hook_point_name, hp in self.hook_dict.items():
-                if name(hook_point_name):
+            # Otherwise, name is a collection of names or a Boolean function on names
+            match_fn = _make_name_matcher(name)
+            for hook_point_name, hp in self._hook_items:
+                if match_fn(hook_point_name):
                     self.check_and_add_hook(hp, hook_point_name, hook, dir=dir, is_permanent=is_permanent)
 
     def add_perma_hook(self, name, hook, dir="fwd") -> None:
@@ -168,29 +489,39 @@ class HookedRootModule(nn.Module):
         a hook point or a Boolean function on hook names and hook is the
         function to add to that hook point, or the hook whose names evaluate
         to True respectively. Ditto bwd_hooks
-        reset_hooks_end (bool): If True, all hooks are removed at the end (ie,
-        including those added in this run)
-        clear_contexts (bool): If True, clears hook contexts whenever hooks are reset
+        reset_hooks_end (bool): If True, the hooks added by this call are removed
+        at the end - hooks that were already on the model (permanent or otherwise)
+        are left alone
+        clear_contexts (bool): If True, clears hook contexts when hooks are removed at the end
         Note that if we want to use backward hooks, we need to set
         reset_hooks_end to be False, so the backward hooks are still there - this function only runs a forward pass.
         """
-        try:
-            for name, hook in fwd_hooks:
-                if type(name) == str:
-                    self.mod_dict[name].add_hook(hook, dir="fwd")
+        # Pass 1: resolve every registration up front, so that a bad specifier (e.g.
+        # an unknown hook name) raises before any hook has been installed. Previously
+        # a mid-registration failure left hooks half-installed, and the finally-block
+        # reset then stripped *all* non-permanent hooks, including ones that predated
+        # this call.
+        registrations: List[Tuple[HookPoint, Callable, str]] = []
+        for hooks_list, direction in ((fwd_hooks, "fwd"), (bwd_hooks, "bwd")):
+            for name, hook in hooks_list:
+                if isinstance(name, str):
+                    registrations.append((self.mod_dict[name], hook, direction))
                 else:
-                    # Otherwise, name is a Boolean function on names
-                    for hook_name, hp in self.hook_dict.items():
-                        if name(hook_name):
-                            hp.add_hook(hook, dir="fwd")
-            for name, hook in bwd_hooks:
-                if type(name) == str:
-                    self.mod_dict[name].add_hook(hook, dir="bwd")
-                else:
-                    # Otherwise, name is a Boolean function on names
-                    for hook_name, hp in self.hook_dict:
-                        if name(hook_name):
-                            hp.add_hook(hook, dir="bwd")
+                    # Otherwise, name is a collection of names or a Boolean function
+                    # on names
+                    match_fn = _make_name_matcher(name)
+                    for hook_name, hp in self._hook_items:
+                        if match_fn(hook_name):
+                            registrations.append((hp, hook, direction))
+
+        # Pass 2: install, run, and tear down only what this call installed - an
+        # O(hooks added) sweep instead of an O(hook points) reset.
+        installed: List[Tuple[HookPoint, str, LensHandle]] = []
+        try:
+            for hp, hook, direction in registrations:
+                installed.append((hp, direction, hp.add_hook(hook, dir=direction)))
+            if self._compiled_forward is not None:
+                return self._compiled_forward(*model_args, **model_kwargs)
             return self.forward(*model_args, **model_kwargs)
         finally:
             if reset_hooks_end:
@@ -198,7 +529,10 @@ class HookedRootModule(nn.Module):
                     logging.warning(
                         "WARNING: Hooks were reset at the end of run_with_hooks while backward hooks were set. This removes the backward hooks before a backward pass can occur"
                     )
-                self.reset_hooks(clear_contexts, including_permanent=False)
+                for hp, direction, handle in installed:
+                    hp.remove_handle(handle, dir=direction)
+                if clear_contexts:
+                    self.clear_contexts()
 
     def add_caching_hooks(
         self,
@@ -207,6 +541,9 @@ class HookedRootModule(nn.Module):
         device=None,
         remove_batch_dim: bool = False,
         cache: Optional[dict] = None,
+        cache_dtype: Optional[torch.dtype] = None,
+        recompute: Optional[Set[str]] = None,
+        async_staging: bool = False,
     ) -> dict:
         """Adds hooks to the model to cache activations. Note: It does NOT actually run the model to get activations, that must be done separately.
 
@@ -216,6 +553,9 @@ class HookedRootModule(nn.Module):
             device (_type_, optional): The device to store on. Defaults to model.cfg.device if set, else CUDA if available, else CPU.
             remove_batch_dim (bool, optional): Whether to remove the batch dimension (only works for batch_size==1). Defaults to False.
             cache (Optional[dict], optional): The cache to store activations in, a new dict is created by default. Defaults to None.
+            cache_dtype (Optional[torch.dtype], optional): If set, activations are cast to this dtype before caching (e.g. torch.bfloat16 to halve cache memory and device-to-host bandwidth, at some precision cost). Defaults to None, i.e. keep the model's dtype.
+            recompute (Optional[Set[str]], optional): Hook names to recompute on demand rather than store - these get a LazyActivation placeholder in the cache instead of a tensor, and no hook is registered for them, so they cost no memory. Call placeholder.materialize(*model_args) to rederive the activation. Defaults to None.
+            async_staging (bool, optional): If True, GPU-to-CPU copies are staged asynchronously through reusable pinned buffers, overlapping transfer with compute. The cache then holds views of reused staging memory until you call sync_caching_hooks(), which must happen after each forward pass and before reading the cache (run_with_cache does this for you). Defaults to False, i.e. plain blocking copies that are always safe to read.
 
         Returns:
             cache (dict): The cache where activations will be stored.
@@ -227,34 +567,210 @@ class HookedRootModule(nn.Module):
         if cache is None:
             cache = {}
 
+        # Resolve names_filter once up front, rather than re-invoking a Python-level
+        # predicate for every hook point - with hundreds of hook points that's pure
+        # interpreter overhead. None selects everything with no filtering at all, a
+        # string is a direct dict lookup, and a list becomes a single frozenset
+        # membership pass; only a genuine callable keeps the per-name call.
         if names_filter is None:
-            names_filter = lambda name: True
-        elif type(names_filter) == str:
-            names_filter = lambda name: name == names_filter
-        elif type(names_filter) == list:
-            names_filter = lambda name: name in names_filter
+            selected_hooks = list(self._hook_items)
+        elif isinstance(names_filter, str):
+            selected_hooks = [(names_filter, self.hook_dict[names_filter])]
+        elif isinstance(names_filter, (list, tuple)):
+            name_set = frozenset(names_filter)
+            selected_hooks = [
+                (name, hp) for name, hp in self._hook_items if name in name_set
+            ]
+        else:
+            selected_hooks = [
+                (name, hp) for name, hp in self._hook_items if names_filter(name)
+            ]
+
+        # Placeholders are created for every recompute name up front (not just the
+        # filter-selected ones), so a recompute name the filter misses can't be
+        # silently dropped - and unknown names fail loudly.
+        if recompute:
+            for name in recompute:
+                if name not in self.hook_dict:
+                    raise ValueError(f"Unknown hook name in recompute: {name}")
+                cache[name] = LazyActivation(self, name)
 
         self.is_caching = True
 
-        def save_hook(tensor, hook):
-            if remove_batch_dim:
-                cache[hook.name] = tensor.detach().to(device)[0]
+        # When caching GPU activations to the CPU, a plain .to("cpu") is a blocking
+        # device-to-host transfer that sits on the forward pass's critical path. With
+        # async_staging we instead copy into a reusable pinned-memory staging buffer
+        # with non_blocking=True, so the transfer overlaps with the next layer's
+        # compute, and synchronize once at the end via sync_caching_hooks. The staging
+        # path is opt-in because until that sync runs the cache holds views of reused
+        # staging memory - run_with_cache owns its cache and syncs automatically, but
+        # callers driving the model themselves (including via cache_all/cache_some)
+        # get plain blocking copies unless they ask otherwise.
+        device = torch.device(device)
+        use_staging = (
+            async_staging and device.type == "cpu" and torch.cuda.is_available()
+        )
+        pinned_buffers: Dict[str, torch.Tensor] = {}
+
+        cache_stream = _get_cache_stream() if use_staging else None
+
+        def stage_copy(dst, src):
+            # Issue the device-to-host copy on the dedicated caching stream, ordered
+            # after the producing kernel via wait_stream. record_stream stops the
+            # caching allocator from reusing src's memory while the copy is in flight.
+            if cache_stream is not None:
+                cache_stream.wait_stream(torch.cuda.current_stream())
+                with torch.cuda.stream(cache_stream):
+                    dst.copy_(src, non_blocking=True)
+                src.record_stream(cache_stream)
             else:
-                cache[hook.name] = tensor.detach().to(device)
+                dst.copy_(src, non_blocking=True)
+            self._cache_needs_sync = True
+
+        def to_cache_device(tensor, key):
+            # The common case is caching on the exact device the model runs on - skip
+            # the .to() dispatch entirely then, it would just allocate a fresh Python
+            # wrapper for a no-op. The match is exact: an index-less target like
+            # "cuda" must still consolidate activations living on other GPUs.
+            if tensor.device == device:
+                return tensor
+            if use_staging and tensor.is_cuda:
+                # Stage through a slice of the coalesced pinned blob if one covering
+                # this activation has been built (i.e. from the second caching pass on).
+                entry = self._pinned_layout.get(key)
+                if entry is not None:
+                    offset, shape, dtype = entry
+                    if shape == tensor.shape and dtype == tensor.dtype:
+                        nbytes = tensor.numel() * tensor.element_size()
+                        staged = (
+                            self._pinned_blob[offset : offset + nbytes]
+                            .view(dtype)
+                            .view(shape)
+                        )
+                        stage_copy(staged, tensor)
+                        self._staged_cache_entries.append((cache, key))
+                        return staged
+                # First time we see this activation (or its shape changed, e.g. a new
+                # sequence length): stage through a per-name pinned buffer and record
+                # the spec so the blob gets (re)built at the next sync.
+                if self._pinned_specs.get(key) != (tuple(tensor.shape), tensor.dtype):
+                    self._pinned_specs[key] = (tuple(tensor.shape), tensor.dtype)
+                    self._pinned_stale = True
+                buffer = pinned_buffers.get(key)
+                if (
+                    buffer is None
+                    or buffer.shape != tensor.shape
+                    or buffer.dtype != tensor.dtype
+                ):
+                    buffer = torch.empty(
+                        tensor.shape, dtype=tensor.dtype, pin_memory=True
+                    )
+                    pinned_buffers[key] = buffer
+                stage_copy(buffer, tensor)
+                self._staged_cache_entries.append((cache, key))
+                return buffer
+            # Any other cross-device copy (e.g. consolidating from another GPU) stays
+            # blocking - there's no staging or sync point covering it.
+            return tensor.to(device)
+
+        # remove_batch_dim and cache_dtype are fixed at registration time, so
+        # specialize the save hooks on them now instead of re-testing the flags on
+        # every invocation - a small saving, but multiplied by hooks x batches.
+        # Forward hooks use .data rather than .detach(): both give a grad-free view,
+        # but .data skips the autograd metadata allocation, which is pure overhead
+        # since the cached copy is read-only. The backward hooks keep .detach() -
+        # gradients warrant the version-counter bookkeeping.
+        if cache_dtype is None:
+
+            def _prep_fwd(tensor):
+                return tensor.data
+
+            def _prep_bwd(tensor):
+                return tensor.detach()
 
-        def save_hook_back(tensor, hook):
-            if remove_batch_dim:
-                cache[hook.name + "_grad"] = tensor.detach().to(device)[0]
-            else:
-                cache[hook.name + "_grad"] = tensor.detach().to(device)
+        else:
+
+            def _prep_fwd(tensor):
+                return tensor.data.to(cache_dtype)
 
-        for name, hp in self.hook_dict.items():
-            if names_filter(name):
-                hp.add_hook(save_hook, "fwd")
-                if incl_bwd:
-                    hp.add_hook(save_hook_back, "bwd")
+            def _prep_bwd(tensor):
+                return tensor.detach().to(cache_dtype)
+
+        if remove_batch_dim:
+
+            def save_hook(tensor, hook):
+                cache[hook.name] = to_cache_device(_prep_fwd(tensor), hook.name)[0]
+
+            def save_hook_back(tensor, hook):
+                key = hook.name + "_grad"
+                cache[key] = to_cache_device(_prep_bwd(tensor), key)[0]
+
+        else:
+
+            def save_hook(tensor, hook):
+                cache[hook.name] = to_cache_device(_prep_fwd(tensor), hook.name)
+
+            def save_hook_back(tensor, hook):
+                key = hook.name + "_grad"
+                cache[key] = to_cache_device(_prep_bwd(tensor), key)
+
+        for name, hp in selected_hooks:
+            if recompute is not None and name in recompute:
+                # Nothing stored for this hook point - its LazyActivation placeholder
+                # was created above.
+                continue
+            hp.add_hook(save_hook, "fwd")
+            if incl_bwd:
+                hp.add_hook(save_hook_back, "bwd")
         return cache
 
+    def sync_caching_hooks(self):
+        """Waits for in-flight asynchronous caching copies and materializes the cache.
+
+        Only needed when driving the model yourself after add_caching_hooks(...,
+        async_staging=True) - call it after each forward pass, before reading the
+        cache. run_with_cache calls it automatically. Safe to call when nothing is
+        pending.
+        """
+        if not self._cache_needs_sync:
+            return
+        if _cache_streams:
+            # Only the caching streams need to drain - no reason to stall every
+            # stream on the device.
+            for stream in _cache_streams.values():
+                stream.synchronize()
+        else:
+            torch.cuda.synchronize()
+        self._cache_needs_sync = False
+        # Staged entries are views into reused pinned staging memory - clone them
+        # out (a fast host-side memcpy, nothing like the cost of the transfer
+        # itself) so the materialized cache isn't clobbered by the next caching run.
+        for staged_cache, key in self._staged_cache_entries:
+            staged_cache[key] = staged_cache[key].clone()
+        self._staged_cache_entries.clear()
+        if self._pinned_stale:
+            self._build_pinned_blob()
+            self._pinned_stale = False
+
+    def _build_pinned_blob(self):
+        # (Re)allocate the coalesced staging buffer from the activation shapes and
+        # dtypes recorded on the last caching pass. Offsets are aligned to 256 bytes so
+        # every slice can be reinterpreted at its own dtype and copies stay aligned.
+        align = 256
+        layout: Dict[str, Tuple[int, Tuple[int, ...], torch.dtype]] = {}
+        offset = 0
+        for name, (shape, dtype) in self._pinned_specs.items():
+            numel = 1
+            for dim in shape:
+                numel *= dim
+            nbytes = numel * torch.empty((), dtype=dtype).element_size()
+            layout[name] = (offset, shape, dtype)
+            offset += (nbytes + align - 1) // align * align
+        if offset == 0:
+            return
+        self._pinned_blob = torch.empty(offset, dtype=torch.uint8, pin_memory=True)
+        self._pinned_layout = layout
+
     def run_with_cache(
         self,
         *model_args,
@@ -264,6 +780,9 @@ class HookedRootModule(nn.Module):
         incl_bwd=False,
         reset_hooks_end=True,
         clear_contexts=False,
+        cache_dtype: Optional[torch.dtype] = None,
+        recompute: Optional[Set[str]] = None,
+        stacked: bool = False,
         **model_kwargs,
     ):
         """
@@ -276,19 +795,81 @@ class HookedRootModule(nn.Module):
         incl_bwd (bool): If True, will call backward on the model output and also cache gradients. It is assumed that the model outputs a scalar, ie. return_type="loss", for predict the next token loss. Custom loss functions are not supported
         reset_hooks_end (bool): If True, all hooks are removed at the end (ie, both those added in this run *and* any added before!)
         clear_contexts (bool): If True, clears hook contexts whenever hooks are reset
+        cache_dtype (Optional[torch.dtype]): If set, cast activations to this dtype before caching, e.g. torch.bfloat16 to halve cache memory and transfer bandwidth
+        recompute (Optional[Set[str]]): Hook names to recompute on demand rather than store - the cache gets a LazyActivation placeholder instead of a tensor, with this run's inputs recorded so placeholder.materialize() rederives the activation. Note that materialize() resets non-permanent hooks, see its docstring
+        stacked (bool): If True, repack the cached activations into a single contiguous [n_hooks, ...] tensor after the run and return views into it. Requires every cached activation to share a shape and dtype, e.g. a names_filter selecting the residual stream at each layer. The contiguous backing improves memory locality for downstream analyses like probing, but note this is a post-run repack: it copies every activation once more and transiently holds both the per-hook tensors and the stacked tensor, i.e. ~2x the cache's memory, until the per-hook tensors are released
         """
         cache_dict = self.add_caching_hooks(
-            names_filter, incl_bwd, device, remove_batch_dim=remove_batch_dim
+            names_filter,
+            incl_bwd,
+            device,
+            remove_batch_dim=remove_batch_dim,
+            cache_dtype=cache_dtype,
+            recompute=recompute,
+            async_staging=True,
         )
+        if recompute:
+            # Record this run's inputs on the placeholders so materialize() can rerun
+            # them without the caller repeating the inputs.
+            for name in recompute:
+                value = cache_dict.get(name)
+                if isinstance(value, LazyActivation):
+                    value._bind_inputs(model_args, model_kwargs)
         model_out = self(*model_args, **model_kwargs)
 
         if incl_bwd:
             model_out.backward()
 
+        # Caching hooks issue their device-to-host copies asynchronously, so make sure
+        # they've all landed (and are cloned out of staging memory) before returning
+        # the cache.
+        self.sync_caching_hooks()
+
         if reset_hooks_end:
             self.reset_hooks(clear_contexts, including_permanent=False)
+        if stacked:
+            cache_dict = self._stack_cache(cache_dict)
         return model_out, cache_dict
 
+    @staticmethod
+    def _stack_cache(cache: dict) -> dict:
+        # Repacks the cached activations into one contiguous [n_hooks, ...] tensor,
+        # replacing each cache entry with a view of its slice so iterating the cache
+        # walks contiguous memory. This is a post-run repack, not a preallocated
+        # write-through: it costs one extra copy per activation and transiently ~2x
+        # the cache's memory while both the per-hook tensors and the stacked tensor
+        # are alive (writing slices directly from the save hooks would need the
+        # shapes before the run, plus clone-outs to stop runs aliasing each other,
+        # which would reintroduce the copies). Non-tensor entries (e.g.
+        # LazyActivation placeholders) are left alone.
+        names = [
+            name for name, value in cache.items() if isinstance(value, torch.Tensor)
+        ]
+        if not names:
+            return cache
+        first = cache[names[0]]
+        for name in names:
+            value = cache[name]
+            if (
+                value.shape != first.shape
+                or value.dtype != first.dtype
+                or value.device != first.device
+            ):
+                raise ValueError(
+                    f"Cannot stack cache: {names[0]} has shape {tuple(first.shape)} "
+                    f"({first.dtype}) but {name} has shape {tuple(value.shape)} "
+                    f"({value.dtype}). Use a names_filter that selects "
+                    "identically-shaped activations, e.g. the residual stream at "
+                    "each layer."
+                )
+        stacked = torch.empty(
+            (len(names), *first.shape), dtype=first.dtype, device=first.device
+        )
+        for i, name in enumerate(names):
+            stacked[i].copy_(cache[name])
+            cache[name] = stacked[i]
+        return cache
+
     def cache_all(self, cache, incl_bwd=False, device=None, remove_batch_dim=False):
         logging.warning(
             "cache_all is deprecated and will eventually be removed, use add_caching_hooks or run_with_cache"